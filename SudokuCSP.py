@@ -1,5 +1,143 @@
 from collections import deque
-import copy
+from importlib.util import find_spec
+
+# The C extension (see sudoku_solver.c) is optional and is built with
+# "python setup.py build_ext --inplace", if it is available the CSP search can be run in C
+# by asking for the "c" backend
+try:
+    import sudoku_solver
+except ImportError:
+    sudoku_solver = None
+
+# NumPy is optional, it is needed to solve many grids at once (see solve_batch) and by Numba
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Numba is optional, if it is installed the CSP search can be run as compiled code by asking
+# for the "numba" backend (see solve_core). It is only imported once that backend is used.
+NUMBA_AVAILABLE = np is not None and find_spec("numba") is not None
+
+# The board is a 9x9 grid of 81 cells
+SIZE = 9
+CELLS = SIZE * SIZE
+
+# Domains are stored as 9-bit masks where bit k set means the digit k+1 is still
+# possible (0x1FF means every digit 1-9 is possible). The tables below are indexed
+# by a mask and are computed once at import so that the solver never has to loop
+# over the bits of a domain itself.
+ALL_DIGITS = 0x1FF
+
+# Number of digits remaining in a domain
+POPCOUNT = [bin(mask).count("1") for mask in range(ALL_DIGITS + 1)]
+
+# Smallest digit remaining in a domain (0 for an empty domain)
+LOWEST_BIT = [(mask & -mask).bit_length() for mask in range(ALL_DIGITS + 1)]
+
+# Bit representing each number on the board (0 is an empty cell, so it has no bit)
+DIGIT_BIT = (0,) + tuple(1 << (d - 1) for d in range(1, 10))
+
+# Digits remaining in a domain in increasing order
+BITS_TO_DIGITS = [tuple(d for d in range(1, 10) if mask & (1 << (d - 1)))
+                  for mask in range(ALL_DIGITS + 1)]
+
+# List containing all the possible ways a knight can move in chess
+# represented by (delta x, delta y)
+KNIGHT_MOVES = (
+    (2, 1), (2, -1), (-2, 1), (-2, -1),
+    (1, 2), (1, -2), (-1, 2), (-1, -2)
+)
+
+# The cells a knight's move away from each cell, indexed by row * 9 + col
+KNIGHT_NEIGHBORS = [
+    tuple((row + delta_row) * 9 + col + delta_col for delta_row, delta_col in KNIGHT_MOVES
+          if 0 <= row + delta_row < 9 and 0 <= col + delta_col < 9)
+    for row in range(9) for col in range(9)
+]
+
+# Returns a list where entry row * 9 + col is a tuple of the cell indices that the cell
+# (row, col) can see. That is according to row, column, box, and (optionally) knight rules.
+# The constraint graph never changes so it is only built once per variant.
+def build_neighbors(knights):
+    table = []
+    for row in range(9):
+        for col in range(9):
+            neighbors = set()
+
+            for i in range(9):
+                if i != col:
+                    neighbors.add(row * 9 + i)
+                if i != row:
+                    neighbors.add(i * 9 + col)
+
+            # Top left corner of the box the current cell is in
+            box_start_row, box_start_col = 3 * (row // 3), 3 * (col // 3)
+            for i in range(3):
+                for j in range(3):
+                    r, c = box_start_row + i, box_start_col + j
+                    if (r, c) != (row, col):
+                        neighbors.add(r * 9 + c)
+
+            if knights:
+                neighbors.update(KNIGHT_NEIGHBORS[row * 9 + col])
+
+            table.append(tuple(sorted(neighbors)))
+    return table
+
+NEIGHBORS = build_neighbors(knights=False)
+NEIGHBORS_WITH_KNIGHTS = build_neighbors(knights=True)
+
+# The 27 units (9 rows, 9 columns and 9 boxes) as tuples of cell indices. Every number
+# 1-9 has to appear exactly once in each unit.
+UNITS = (
+    [tuple(row * 9 + col for col in range(9)) for row in range(9)] +
+    [tuple(row * 9 + col for row in range(9)) for col in range(9)] +
+    [tuple((3 * (box // 3) + i) * 9 + 3 * (box % 3) + j for i in range(3) for j in range(3))
+     for box in range(9)]
+)
+
+# The indices (into UNITS) of the row, column and box of each cell
+UNITS_OF = [(row, 9 + col, 18 + 3 * (row // 3) + col // 3) for row in range(9) for col in range(9)]
+
+# The 3 cells where a row or column crosses a box. Segment row * 3 + k is where row crosses
+# the k-th box of the row and segment 27 + col * 3 + k is where col crosses the k-th box
+# of the column.
+SEGMENTS = (
+    [tuple(row * 9 + 3 * k + j for j in range(3)) for row in range(9) for k in range(3)] +
+    [tuple((3 * k + i) * 9 + col for i in range(3)) for col in range(9) for k in range(3)]
+)
+
+# Returns a tuple for every segment of (the segment, the other 2 segments of its row or column,
+# the other 2 segments of its box, the cells of those row or column segments, the cells of
+# those box segments), all segments given by their index into SEGMENTS
+def build_intersections():
+    intersections = []
+    for offset in (0, 27):
+        for line in range(9):
+            for k in range(3):
+                segment = offset + line * 3 + k
+                line_rest = [offset + line * 3 + other for other in range(3) if other != k]
+                box_start = 3 * (line // 3)
+                box_rest = [offset + (box_start + other) * 3 + k
+                            for other in range(3) if box_start + other != line]
+                intersections.append((
+                    segment, line_rest, box_rest,
+                    SEGMENTS[line_rest[0]] + SEGMENTS[line_rest[1]],
+                    SEGMENTS[box_rest[0]] + SEGMENTS[box_rest[1]],
+                ))
+    return intersections
+
+INTERSECTIONS = build_intersections()
+
+# Boards are stored as a flat bytearray of 81 numbers indexed by row * 9 + col (0 is empty).
+# Converts a 9x9 list of lists into that representation
+def flatten(board):
+    return bytearray(num for row in board for num in row)
+
+# Converts a flat board back into a 9x9 list of lists (e.g. for a JSON response)
+def unflatten(board):
+    return [list(board[row * 9:row * 9 + 9]) for row in range(9)]
 
 # Solves sudoku grids as a CSP (constraint satisfaction problem)
 # utilizing the AC-3 (Arc Consistency Algorithm #3) Algorithm in
@@ -15,134 +153,388 @@ class SudokuCSP:
     # if the user wants to add the additional constraint that identical numbers
     # cannot be seperated by a knight's move in chess (2x1 L shape away). This is
     # optional is by default not included.
-    def __init__(self, board, knights=False):
-        self.board = board
+    # The "backend" variable picks the search that solve runs. "python" is the solver
+    # described above, "numba" is the compiled solve_core which skips the LCV heuristic and
+    # the locked candidates and so makes a different number of moves, "c" is the same search
+    # as solve_core in the sudoku_solver extension.
+    def __init__(self, board, knights=False, backend="python"):
+        if backend not in ("python", "numba", "c"):
+            raise ValueError(f"Unknown backend {backend!r}")
+        if backend == "numba" and not NUMBA_AVAILABLE:
+            raise ImportError("The numba backend requires numba and numpy to be installed")
+        if backend == "c" and sudoku_solver is None:
+            raise ImportError("The c backend requires the sudoku_solver extension to be built")
+
+        self.board = flatten(board)
         self.knights = knights
-        self.size = 9
-        self.subgrid_size = int(self.size ** 0.5)
+        self.backend = backend
+        self.size = SIZE
+        self.subgrid_size = int(SIZE ** 0.5)
 
-        # List containing all the possible ways a knight can move in chess
-        # represented by (delta x, delta y)
-        self.knight_moves = [
-            (2, 1), (2, -1), (-2, 1), (-2, -1),
-            (1, 2), (1, -2), (-1, 2), (-1, -2)
-        ]
+        # Cells that each cell can "see", indexed by row * 9 + col
+        self.NEIGHBORS = NEIGHBORS_WITH_KNIGHTS if knights else NEIGHBORS
 
-         # Dictionary mapping a coordinate to remaining values
-        self.domains = {}
+        # The units each cell belongs to. With knight rules every cell also gets a
+        # "pseudo-unit" of the cells a knight's move away, which is only used for counting
+        # conflicts since (unlike a real unit) it does not have to contain every number.
+        self.UNITS = list(UNITS)
+        self.UNITS_OF = list(UNITS_OF)
+        if knights:
+            for cell in range(CELLS):
+                self.UNITS_OF[cell] += (len(self.UNITS),)
+                self.UNITS.append(KNIGHT_NEIGHBORS[cell])
+
+        # List of 81 bitmasks (indexed by row * 9 + col) holding the remaining values of each cell
+        self.domains = [0] * CELLS
 
         # double ended queue that allows for elements to be accessed/inserted/popped from either side
         self.constraints = deque()
 
+        # set of the constraints currently in the queue, so the same arc is never queued twice
+        self.in_queue = set()
+
+        # Undo log of (cell, original domain) tuples, one for every domain that was pruned.
+        # Pruning is undone by popping entries back to an earlier length of the trail.
+        self.trail = []
+
         # set up the domains for each cell (#s 1-9)
         self.initialize_domain()
 
-        # set up the constraints graph where each constraint is a tuple between two coordinates 
-        # (where is a coordinate is a tuple of (row, col)) indicating that they constrain each other
+        # buckets[k] holds the empty cells that have k values left in their domain and
+        # size_of[cell] is the bucket the cell is in (None once a number is placed in it)
+        self.size_of = [None] * CELLS
+        self.buckets = [set() for _ in range(SIZE + 1)]
+        self.initialize_buckets()
+
+        # set up the constraints graph where each constraint is a tuple between two cells
+        # (where a cell is its index row * 9 + col) indicating that they constrain each other.
+        # Only the knight constraints are queued, the rows, columns and boxes are made
+        # consistent a whole unit at a time by alldiff.
         self.initialize_constraints()
 
         # counter that serves as a metric to measure the efficiency of the CSP solver
         self.move_counter = 0
     
     # Initialzes the domains of each cell, if the cell is empty (0 in grid) then the domain of that cell
-    # is initialized as a set containing the numbers 1-9 inclusive, otherwise if the cell already contains
-    # a number then the domain is just that number
+    # is initialized as a mask containing the numbers 1-9 inclusive, otherwise if the cell already contains
+    # a number then the domain is just the bit of that number
     def initialize_domain(self):
-        for row in range(self.size):
-            for col in range(self.size):
-                if self.board[row][col] == 0:
-                    self.domains[(row, col)] = set(range(1, 10))
+        board = self.board
+        domains = self.domains
+        for row in range(SIZE):
+            for col in range(SIZE):
+                cell = row * SIZE + col
+                if board[cell] == 0:
+                    domains[cell] = ALL_DIGITS
                 else:
-                    self.domains[(row, col)] = {self.board[row][col]}
+                    domains[cell] = 1 << (board[cell] - 1)
+
+    # Places every empty cell in the bucket matching the size of its domain
+    def initialize_buckets(self):
+        board = self.board
+        domains = self.domains
+        size_of = self.size_of
+        buckets = self.buckets
+        for cell in range(CELLS):
+            if board[cell] == 0:
+                size_of[cell] = POPCOUNT[domains[cell]]
+                buckets[size_of[cell]].add(cell)
+
+    # Moves an empty cell to the bucket matching the current size of its domain
+    def update_bucket(self, cell):
+        size_of = self.size_of
+        old_size = size_of[cell]
+        if old_size is None:
+            return
+        new_size = POPCOUNT[self.domains[cell]]
+        if new_size != old_size:
+            buckets = self.buckets
+            buckets[old_size].discard(cell)
+            buckets[new_size].add(cell)
+            size_of[cell] = new_size
 
     # Creates a representation of a constraint graph using a double ended queue of tuples of 2 cells
-    # representing that those two cells constrain each other. Calls the neighbors method which returns
-    # a list of tuples (each tuple representing the coordinates of a neighboring cell) that can be "seen"
-    # and is constrained by the current cell. If the cell is not empty then there is no need to initialize
-    # the constraints
+    # representing that those two cells constrain each other. Uses the knight table which holds
+    # the index of every cell a knight's move away from the current cell. Filled in cells are
+    # included so that two given numbers that break the knight rule are caught.
     def initialize_constraints(self):
-        for row in range(self.size):
-            for col in range(self.size):
-                if self.board[row][col] == 0:
-                    neighbors = self.neighbors((row, col))
-                    for neighbor in neighbors:
-                        self.constraints.append(((row, col), neighbor))
+        if self.knights:
+            add_constraint = self.add_constraint
+            for cell in range(CELLS):
+                for neighbor in KNIGHT_NEIGHBORS[cell]:
+                    add_constraint(cell, neighbor)
+
+    # Makes every unit consistent as a whole: the numbers of the cells with a single value
+    # left are removed from the other cells of the unit in one pass, and the units of every
+    # pruned cell are checked again until nothing changes. Returns False if two cells of a
+    # unit are left with the same single value or a domain runs out of values. Any cell that
+    # is left with a single value gets its knight constraints queued for AC-3.
+    def alldiff(self):
+        domains = self.domains
+        trail = self.trail
+        update_bucket = self.update_bucket
+        add_constraint = self.add_constraint
+        knights = self.knights
+
+        pending = set(range(len(UNITS)))
+        while pending:
+            unit = UNITS[pending.pop()]
+
+            used = 0
+            for cell in unit:
+                domain = domains[cell]
+                if POPCOUNT[domain] == 1:
+                    if used & domain:
+                        return False
+                    used |= domain
+
+            for cell in unit:
+                domain = domains[cell]
+                if POPCOUNT[domain] != 1 and domain & used:
+                    trail.append((cell, domain))
+                    domain &= ~used
+                    domains[cell] = domain
+                    update_bucket(cell)
+                    if not domain:
+                        return False
+                    pending.update(UNITS_OF[cell])
+                    if knights and POPCOUNT[domain] == 1:
+                        for neighbor in KNIGHT_NEIGHBORS[cell]:
+                            add_constraint(neighbor, cell)
+        return True
+
+    # Queues the constraint (cell1, cell2) unless it is already waiting in the queue
+    def add_constraint(self, cell1, cell2):
+        arc = (cell1, cell2)
+        if arc not in self.in_queue:
+            self.constraints.append(arc)
+            self.in_queue.add(arc)
 
     # The AC-3 Algorithm uses Arc Consistency to prune the domains of each
     # cell as much as possible before selecting values from them. A pair of 
     # cells is arc consistent if for each value x in the domain of Cell1 there
     # exists an a value y in the domain of Cell2 s.t. that x and y satisfy the
     # constraints between Cell1 and Cell2.
+    # The original domain of every cell that gets pruned is pushed on the trail.
     def ac3(self):
+        domains = self.domains
+        constraints = self.constraints
+        in_queue = self.in_queue
+        neighbors = self.NEIGHBORS
+        update_domain = self.update_domain
+        update_bucket = self.update_bucket
+        add_constraint = self.add_constraint
+        trail = self.trail
+
         # While constraints still exist
-        while self.constraints:
+        while constraints:
             # pops a constraint tuple from the double ended queue
-            cell1, cell2 = self.constraints.popleft()
+            arc = constraints.popleft()
+            in_queue.discard(arc)
+            cell1, cell2 = arc
+            original_domain = domains[cell1]
 
             # updates the domain of cell1 if cell1 and cell2 are arc consistent
-            updated = self.update_domain(cell1, cell2)
+            updated = update_domain(cell1, cell2)
 
             # if they are arc consistent...
             if updated:
+                update_bucket(cell1)
+                trail.append((cell1, original_domain))
+
                 # If there are no values left in the domain of cell1 then the grid is
-                # impossible to solve.
-                if not self.domains[cell1]:
+                # impossible to solve. The remaining constraints are dropped so they
+                # do not leak into the next call.
+                if not domains[cell1]:
+                    constraints.clear()
+                    in_queue.clear()
                     return False
                 
-                # Adds new constraints between neighbors of cell1 and cell1
-                for cell3 in self.neighbors(cell1):
-                    if cell3 != cell2:
-                        self.constraints.append((cell3, cell1))
+                # Adds new constraints between neighbors of cell1 and cell1. Only a cell
+                # with a single value left can remove values from its neighbors.
+                if POPCOUNT[domains[cell1]] == 1:
+                    for cell3 in neighbors[cell1]:
+                        if cell3 != cell2:
+                            add_constraint(cell3, cell1)
 
         # returns true when all constraints have been accounted for and domains have been pruned
         return True
 
-    # updates the domain of cell1 if cell1 and cell2 are arc consistent
+    # updates the domain of cell1 if cell1 and cell2 are arc consistent. For the "not equal"
+    # constraint a value of cell1 only loses its support when cell2 has that single value left.
     def update_domain(self, cell1, cell2):
-        updated = False
-        for x in set(self.domains[cell1]):
-            if all(x == y for y in self.domains[cell2]):
-                self.domains[cell1].remove(x)
-                updated = True
-        return updated
-    
-    # returns all the cells that the cell parameter can see. That is according
-    # to row, column, box, and knight rules.
-    def neighbors(self, cell):
-        row, col = cell
-        neighbors = set()
-
-        for i in range(self.size):
-            if i != col:
-                neighbors.add((row, i))
-            if i != row:
-                neighbors.add((i, col))
-                
-        # Top left corner of the box the current cell is in
-        box_start_row, box_start_col = 3 * (row // 3), 3 * (col // 3)
-        for i in range(3):
-            for j in range(3):
-                r, c = box_start_row + i, box_start_col + j
-                if (r, c) != cell:
-                    neighbors.add((r, c))
-        
-        if self.knights:
-            for delta_row, delta_col in self.knight_moves:
-                x, y = row + delta_row, col + delta_col
-                if 0 <= x < self.size and 0 <= y < self.size:
-                    neighbors.add((x, y))
+        domains = self.domains
+        value = domains[cell2]
+        if POPCOUNT[value] == 1 and domains[cell1] & value:
+            domains[cell1] ^= value
+            return True
+        return False
+
+    # Looks for hidden singles: a number that only fits in one cell of a unit has to go
+    # in that cell, so the cell's domain is reduced to that number and AC-3 removes it
+    # from the cell's neighbors. Every cell with a single value left (a naked single) is
+    # already handled by AC-3. Only the units of the cells on the trail since "mark" are
+    # checked (all units if no mark is given), and the units of every cell pruned along the
+    # way are checked as well. Locked candidates are looked for after that. Returns False if
+    # a unit has no place left for one of the numbers.
+    def propagate(self, mark=None):
+        domains = self.domains
+        trail = self.trail
+        buckets = self.buckets
+        neighbors = self.NEIGHBORS
+        add_constraint = self.add_constraint
+        update_bucket = self.update_bucket
+        ac3 = self.ac3
+
+        if mark is None:
+            pending = set(range(len(UNITS)))
+        else:
+            pending = {unit for cell, _ in trail[mark:] for unit in UNITS_OF[cell]}
+
+        while True:
+            while pending:
+                unit = UNITS[pending.pop()]
+
+                # once holds the numbers that fit in at least one cell of the unit,
+                # twice the numbers that fit in at least two
+                once = twice = 0
+                for cell in unit:
+                    domain = domains[cell]
+                    twice |= once & domain
+                    once |= domain
+                if once != ALL_DIGITS:
+                    return False
+
+                hidden = once & ~twice
+                while hidden:
+                    bit = hidden & -hidden
+                    hidden ^= bit
+                    for cell in unit:
+                        if domains[cell] & bit:
+                            break
+                    else:
+                        # an earlier hidden single of this unit pruned the only place left for bit
+                        return False
+                    if domains[cell] == bit:
+                        continue
+
+                    mark = len(trail)
+                    trail.append((cell, domains[cell]))
+                    domains[cell] = bit
+                    update_bucket(cell)
+
+                    for neighbor in neighbors[cell]:
+                        add_constraint(neighbor, cell)
+                    if not ac3():
+                        return False
+
+                    for changed, _ in trail[mark:]:
+                        pending.update(UNITS_OF[changed])
+
+            # Once there are no hidden singles left, look for locked candidates and start
+            # over with the units of every cell they pruned. This is only worth it when the
+            # search is about to guess, not while an empty cell has a single value left.
+            if buckets[1]:
+                return True
+            mark = len(trail)
+            if not self.locked_candidates():
+                return False
+            if len(trail) == mark:
+                return True
+            pending = {unit for cell, _ in trail[mark:] for unit in UNITS_OF[cell]}
+
+    # Locked candidates: if the numbers of a box that fit in a row (or column) of the box don't
+    # fit anywhere else in the box, they have to go in that row and are removed from the rest
+    # of the row ("pointing"). The same holds the other way around, numbers of a row that only
+    # fit where the row crosses a box are removed from the rest of the box ("claiming").
+    # Returns False if a domain runs out of values.
+    def locked_candidates(self):
+        # The numbers that fit in each segment. These are only read before the pruning below,
+        # if a segment loses numbers in the meantime the masks still hold every number it has.
+        domains = self.domains
+        remove_values = self.remove_values
+        masks = [domains[a] | domains[b] | domains[c] for a, b, c in SEGMENTS]
+
+        # Only numbers that are still in the rest of the row/column (or box) need removing,
+        # which also skips the numbers already placed in the segment
+        for segment, (line1, line2), (box1, box2), line_cells, box_cells in INTERSECTIONS:
+            segment_mask = masks[segment]
+            line_mask = masks[line1] | masks[line2]
+            box_mask = masks[box1] | masks[box2]
+            pointing = segment_mask & ~box_mask & line_mask
+            if pointing and not remove_values(line_cells, pointing):
+                return False
+            claiming = segment_mask & ~line_mask & box_mask
+            if claiming and not remove_values(box_cells, claiming):
+                return False
+
+        # Prune the neighbors of every cell that was left with a single value
+        return self.ac3()
 
-        return neighbors
+    # Removes the values in the mask from the domains of the cells, saving the original domains
+    # on the trail. Any cell left with a single value gets its constraints queued for AC-3.
+    def remove_values(self, cells, mask):
+        domains = self.domains
+        trail = self.trail
+        neighbors = self.NEIGHBORS
+        update_bucket = self.update_bucket
+        add_constraint = self.add_constraint
+        for cell in cells:
+            domain = domains[cell]
+            if domain & mask:
+                trail.append((cell, domain))
+                domain &= ~mask
+                domains[cell] = domain
+                update_bucket(cell)
+                if not domain:
+                    self.constraints.clear()
+                    self.in_queue.clear()
+                    return False
+                if POPCOUNT[domain] == 1:
+                    for neighbor in neighbors[cell]:
+                        add_constraint(neighbor, cell)
+        return True
 
-    # After the domains have been pruned through the AC-3 algorithm we will attempt
-    # to solve the grid.
+    # After the domains have been pruned through alldiff and the AC-3 algorithm and the
+    # hidden singles have been filled in we will attempt to solve the grid.
     def solve(self):
 
+        if self.backend == "c":
+            return self.solve_c()
+        if self.backend == "numba":
+            return self.solve_numba()
+
         # If the grid is impossible to solve...
-        if not self.ac3():
+        if not self.alldiff() or not self.ac3() or not self.propagate():
             return False
         
         return self.backtrack()
+
+    # Solves the grid with the C extension, copying the solution and the number of moves
+    # back into the solver
+    def solve_c(self):
+        solved, board, moves = sudoku_solver.solve(bytes(self.board), self.knights)
+
+        self.move_counter += moves
+        if solved:
+            self.board[:] = board
+            self.domains[:] = [DIGIT_BIT[num] for num in board]
+        return solved
+
+    # Solves the grid with the compiled solve_core, copying the solution and the number
+    # of moves back into the solver
+    def solve_numba(self):
+        compile_numba()
+        tables = numba_tables(self.knights)
+        board = np.frombuffer(bytes(self.board), dtype=np.uint8).copy()
+        domains = np.array(self.domains, dtype=np.int64)
+        solved, moves = solve_core(board, domains, *tables)
+
+        self.move_counter += moves
+        if solved:
+            self.board[:] = board.tobytes()
+            self.domains[:] = domains.tolist()
+        return solved
     
     def backtrack(self):
         # Looks for an empty cell with the Minimum Remaining Values left in its
@@ -152,91 +544,133 @@ class SudokuCSP:
         # If there are no more empty cells then the grid has been solved.
         if not empty:
             return True
-        row, col = empty
 
-        # lcv_list contains a list of the numbers in the cell's domain, sorted by the number
-        # how constraining that number is on other cells. This is the LCV heuristic
-        lcv_list = self.lcv(row, col)
-        for num in lcv_list:
-            if num in self.domains[(row, col)]:
+        # The search uses a stack instead of recursion. Every frame holds an empty cell,
+        # the numbers of its domain that are left to try, sorted by how constraining they are
+        # on other cells (this is the LCV heuristic), and the trail mark of its placement.
+        mrv = self.mrv
+        lcv = self.lcv
+        set_domain = self.set_domain
+        restore = self.restore
+        trail = self.trail
 
-                # Modifies the domain of the current cell and its neighbors, storing 
-                # the original domain information of itself and its neighbors in "original_domains"
-                # This will increase the move counter by 1 since a number has been placed in the grid.
-                changes, original_domains = self.set_domain(row, col, num)
+        stack = []
+        while empty:
+            row, col = empty
+            stack.append((row, col, iter(lcv(row, col)), len(trail)))
+            empty = None
 
-                # Recursively calls the solve method, if solvable returns True
-                if self.solve():
-                    return True
-                
-                # If not solvable then the original domains of the current cell and its neighbors
-                # are restored and the next number will be checked for its validity.
-                self.restore(row, col, changes, original_domains)
+            while stack and not empty:
+                row, col, nums, mark = stack[-1]
+                num = next(nums, 0)
+
+                # If none of the numbers result in a solvable grid then the placement in the
+                # previous cell was wrong, so it is undone and its next number will be checked.
+                if not num:
+                    stack.pop()
+                    if stack:
+                        row, col, _, mark = stack[-1]
+                        restore(row, col, mark)
+                    continue
 
-        # If none of the numbers result in a solvable grid then the grid is impossible to solve.
+                # Modifies the domain of the current cell and its neighbors, storing
+                # the original domains of every cell it pruned on the trail after "mark"
+                # This will increase the move counter by 1 since a number has been placed in the grid.
+                if set_domain(row, col, num):
+                    empty = mrv()
+                    if not empty:
+                        return True
+                else:
+                    # The original domains of the current cell and its neighbors are restored
+                    # and the next number will be checked for its validity.
+                    restore(row, col, mark)
+
+        # If the stack runs out then the grid is impossible to solve.
         return False
 
-    # Returns the cell with the minimum remaining values, meaning it's domain has been pruned the most
+    # Returns the cell with the minimum remaining values, meaning it's domain has been pruned the most.
+    # This is the first cell of the lowest non-empty bucket.
     def mrv(self):
-        min_cell = None
-        min_values = self.size + 1
-        for row in range(self.size):
-            for col in range(self.size):
-                if self.board[row][col] == 0 and len(self.domains[(row, col)]) < min_values:
-                    min_cell = (row, col)
-                    min_values = len(self.domains[(row, col)])
-        return min_cell
+        for bucket in self.buckets:
+            if bucket:
+                cell = next(iter(bucket))
+                return divmod(cell, SIZE)
+        return None
 
     # Returns a list of values within a cell's domain sorted how constraining that value is on other cells
     def lcv(self, row, col):
 
-        # Helper function that counts the number of conflicts a value has with neighboring cells.
-        def num_conflicts(num):
-            count = 0
-            for (r, c) in self.neighbors((row, col)):
-                if (r, c) in self.domains and num in self.domains[(r, c)]:
-                    count += 1
-            return count
-        
-        lcv_list = sorted(self.domains[(row, col)], key=num_conflicts)
+        domains = self.domains
+        units = self.UNITS
+        cell = row * SIZE + col
+        domain = domains[cell]
+
+        # With two values or fewer the values are tried in increasing order, counting the
+        # conflicts to sort two values costs more than it saves
+        if POPCOUNT[domain] <= 2:
+            return BITS_TO_DIGITS[domain]
+
+        # Counts the number of conflicts every value has with the other cells in the cell's
+        # units in a single pass. A cell sharing both a row/column and the box is counted twice.
+        conflicts = [0] * (SIZE + 1)
+        for unit in self.UNITS_OF[cell]:
+            for other in units[unit]:
+                if other != cell:
+                    for num in BITS_TO_DIGITS[domains[other] & domain]:
+                        conflicts[num] += 1
+
+        lcv_list = sorted(BITS_TO_DIGITS[domain], key=conflicts.__getitem__)
         return lcv_list
     
-    # Modifies the domain of the current cell and all of its neighbors, removing num.
-    # Will also return the original domains so they can be restored if the grid is not
-    # solvable with num in the current cell.
+    # Places num in the current cell and maintains arc consistency from there: the
+    # arcs from every neighbor to the current cell are revised with AC-3, which removes
+    # num from the neighbors and keeps pruning from any neighbor left with a single value.
+    # Any hidden singles this creates are then propagated as well. Returns whether the
+    # grid is still consistent. Every pruned domain is saved on the trail, so taking the
+    # length of the trail before calling this lets restore undo the placement if the grid
+    # is not solvable with num in the current cell.
     def set_domain(self, row, col, num):
-        self.board[row][col] = num
-        changes = []
-        original_domains = {}
-
-        original_domains[(row, col)] = self.domains[(row, col)].copy()
+        domains = self.domains
+        trail = self.trail
+        size_of = self.size_of
+        add_constraint = self.add_constraint
+        cell = row * SIZE + col
+        self.board[cell] = num
+        mark = len(trail)
+        trail.append((cell, domains[cell]))
 
-        for (r, c) in self.neighbors((row, col)):
-            if num in self.domains[(r, c)]:
-                if (r, c) not in original_domains:
-                    original_domains[(r, c)] = self.domains[(r, c)].copy()
-                self.domains[(r, c)].remove(num)
-                changes.append((r, c))
-
-        self.domains[(row, col)] = {num}
+        self.buckets[size_of[cell]].discard(cell)
+        size_of[cell] = None
+        domains[cell] = 1 << (num - 1)
         self.move_counter += 1
 
-        return changes, original_domains
+        for neighbor in self.NEIGHBORS[cell]:
+            add_constraint(neighbor, cell)
+
+        return self.ac3() and self.propagate(mark)
 
     # Restores the domain of all cells affected by set_domain to the original domains
-    def restore(self, row, col, changes, original_domains):
-        self.board[row][col] = 0
+    def restore(self, row, col, mark):
+        domains = self.domains
+        trail = self.trail
+        update_bucket = self.update_bucket
+        cell = row * SIZE + col
+        self.board[cell] = 0
 
-        # Restore the previous domains of all affected cells
-        for (r, c) in changes:
-            self.domains[(r, c)] = original_domains[(r, c)]
+        # Pop the trail back to the mark so each cell ends up with its oldest domain
+        while len(trail) > mark:
+            changed, domain = trail.pop()
+            domains[changed] = domain
+            update_bucket(changed)
 
-        # Restore the domain of the current cell
-        self.domains[(row, col)] = original_domains[(row, col)]
+        # Put the current cell back in the bucket of its restored domain
+        size = POPCOUNT[domains[cell]]
+        self.size_of[cell] = size
+        self.buckets[size].add(cell)
 
     # Prints the board and the number of moves required
     def print_board(self):
-        for row in self.board:
+        for row in unflatten(self.board):
             print(" ".join(str(num) if num != 0 else '.' for num in row))
         print(f"Total moves made: {self.move_counter}") 
 
@@ -244,6 +678,328 @@ class SudokuCSP:
         return self.move_counter
 
 
+# Lookup tables and work arrays used by solve_core, built once for each set of rules
+NUMBA_TABLES = {}
+
+def numba_tables(knights):
+    if knights not in NUMBA_TABLES:
+        neighbors = NEIGHBORS_WITH_KNIGHTS if knights else NEIGHBORS
+        width = max(len(cells) for cells in neighbors)
+        neighbor_table = np.full((81, width), -1, dtype=np.int64)
+        for cell, cells in enumerate(neighbors):
+            neighbor_table[cell, :len(cells)] = cells
+        NUMBA_TABLES[knights] = (
+            neighbor_table,
+            np.array([len(cells) for cells in neighbors], dtype=np.int64),
+            np.array(UNITS, dtype=np.int64),
+            np.array(POPCOUNT, dtype=np.int64),
+            np.array(LOWEST_BIT, dtype=np.int64),
+        )
+    return NUMBA_TABLES[knights]
+
+# Replaces the functions of solve_core below with their Numba compiled versions, the first
+# time the numba backend is used. Callees are compiled first so solve_core calls the
+# compiled versions of them.
+def compile_numba():
+    global prune, propagate_core, mrv_core, solve_core, NUMBA_COMPILED
+    if not NUMBA_COMPILED:
+        from numba import njit
+        prune = njit(cache=True)(prune)
+        propagate_core = njit(cache=True)(propagate_core)
+        mrv_core = njit(cache=True)(mrv_core)
+        solve_core = njit(cache=True)(solve_core)
+        NUMBA_COMPILED = True
+
+NUMBA_COMPILED = False
+
+# Removes bits from the domain of a cell, saving the original domain on the trail
+def prune(domains, cell, remove, trail_cell, trail_mask, trail_length):
+    trail_cell[trail_length] = cell
+    trail_mask[trail_length] = domains[cell]
+    domains[cell] &= ~remove
+    return trail_length + 1
+
+# Propagates every cell in queue[:queue_length] that has a single value left: the value
+# is removed from its neighbors (any neighbor left with a single value is queued as well)
+# and then the hidden singles of every unit are filled in, until nothing changes.
+# Returns False if a domain or a unit ran out of values, along with the new length of the trail.
+def propagate_core(domains, neighbors, neighbor_count, units, popcount, queue, queue_length,
+                   trail_cell, trail_mask, trail_length):
+    while queue_length > 0:
+        head = 0
+        while head < queue_length:
+            cell = queue[head]
+            head += 1
+            value = domains[cell]
+            for k in range(neighbor_count[cell]):
+                neighbor = neighbors[cell, k]
+                if domains[neighbor] & value:
+                    trail_length = prune(domains, neighbor, value, trail_cell, trail_mask, trail_length)
+                    if domains[neighbor] == 0:
+                        return False, trail_length
+                    if popcount[domains[neighbor]] == 1:
+                        queue[queue_length] = neighbor
+                        queue_length += 1
+
+        # Hidden singles, any new singleton is queued for the next round
+        queue_length = 0
+        for u in range(units.shape[0]):
+            once = 0
+            twice = 0
+            for k in range(9):
+                mask = domains[units[u, k]]
+                twice |= once & mask
+                once |= mask
+            if once != 0x1FF:
+                return False, trail_length
+            hidden = once & ~twice
+            while hidden:
+                bit = hidden & -hidden
+                hidden ^= bit
+                for k in range(9):
+                    cell = units[u, k]
+                    if domains[cell] & bit:
+                        if domains[cell] != bit:
+                            trail_length = prune(domains, cell, ~bit, trail_cell, trail_mask, trail_length)
+                            queue[queue_length] = cell
+                            queue_length += 1
+                        break
+    return True, trail_length
+
+# Returns the empty cell with the fewest values left in its domain, or -1 if the board is full
+def mrv_core(board, domains, popcount):
+    best = -1
+    best_size = 10
+    for cell in range(81):
+        if board[cell] == 0 and popcount[domains[cell]] < best_size:
+            best = cell
+            best_size = popcount[domains[cell]]
+    return best
+
+# Compiled version of the CSP search. It uses the same bitmask domains, maintains arc
+# consistency and hidden singles after every placement and picks cells by MRV, but tries
+# values in increasing order instead of sorting them by LCV. The recursion is replaced by
+# an explicit stack of (cell, values left to try, trail length) frames and every pruned
+# domain is saved on a trail so a frame can undo its placement by unwinding the trail.
+# Returns whether the grid was solved and the number of moves made.
+def solve_core(board, domains, neighbors, neighbor_count, units, popcount, lowest_bit):
+    trail_cell = np.empty(81 * 10, dtype=np.int64)
+    trail_mask = np.empty(81 * 10, dtype=np.int64)
+    queue = np.empty(81 * 2, dtype=np.int64)
+    stack_cell = np.empty(82, dtype=np.int64)
+    stack_remaining = np.empty(82, dtype=np.int64)
+    stack_mark = np.empty(82, dtype=np.int64)
+    moves = 0
+
+    queue_length = 0
+    for cell in range(81):
+        if popcount[domains[cell]] == 1:
+            queue[queue_length] = cell
+            queue_length += 1
+    consistent, trail_length = propagate_core(domains, neighbors, neighbor_count, units, popcount,
+                                              queue, queue_length, trail_cell, trail_mask, 0)
+    if not consistent:
+        return False, moves
+
+    cell = mrv_core(board, domains, popcount)
+    if cell < 0:
+        return True, moves
+
+    depth = 0
+    stack_cell[0] = cell
+    stack_remaining[0] = domains[cell]
+    stack_mark[0] = trail_length
+    while depth >= 0:
+        cell = stack_cell[depth]
+
+        # Undo the previous value tried in this frame
+        while trail_length > stack_mark[depth]:
+            trail_length -= 1
+            domains[trail_cell[trail_length]] = trail_mask[trail_length]
+        board[cell] = 0
+
+        remaining = stack_remaining[depth]
+        if remaining == 0:
+            depth -= 1
+            continue
+        bit = remaining & -remaining
+        stack_remaining[depth] = remaining ^ bit
+
+        board[cell] = lowest_bit[bit]
+        moves += 1
+        if domains[cell] != bit:
+            trail_length = prune(domains, cell, ~bit, trail_cell, trail_mask, trail_length)
+            queue[0] = cell
+            consistent, trail_length = propagate_core(domains, neighbors, neighbor_count, units,
+                                                      popcount, queue, 1, trail_cell, trail_mask,
+                                                      trail_length)
+            if not consistent:
+                continue
+
+        cell = mrv_core(board, domains, popcount)
+        if cell < 0:
+            return True, moves
+        depth += 1
+        stack_cell[depth] = cell
+        stack_remaining[depth] = domains[cell]
+        stack_mark[depth] = trail_length
+    return False, moves
+
+
+# Lookup tables used by propagate_batch, built once for each set of rules
+BATCH_TABLES = {}
+
+def batch_tables(knights):
+    if knights not in BATCH_TABLES:
+        neighbors = NEIGHBORS_WITH_KNIGHTS if knights else NEIGHBORS
+        width = max(len(cells) for cells in neighbors)
+
+        # Missing neighbors point at column 81, an extra cell that never has a value
+        neighbor_table = np.full((81, width), 81, dtype=np.intp)
+        for cell, cells in enumerate(neighbors):
+            neighbor_table[cell, :len(cells)] = cells
+        BATCH_TABLES[knights] = (
+            neighbor_table,
+            np.array(UNITS, dtype=np.intp),
+            np.array(UNITS_OF, dtype=np.intp),
+            np.array(POPCOUNT, dtype=np.uint8),
+        )
+    return BATCH_TABLES[knights]
+
+# Propagates naked and hidden singles on an (N, 81) array of domains, one round at a time for
+# every grid that is still changing, until no grid changes anymore. Every round is a handful
+# of NumPy operations over all of those grids at once. Returns an array of N booleans that
+# is False for the grids that turned out to be impossible to solve.
+def propagate_batch(domains, knights):
+    neighbors, units, units_of, popcount = batch_tables(knights)
+    live = np.ones(len(domains), dtype=bool)
+    active = np.arange(len(domains))
+
+    while len(active):
+        current = domains[active]
+        sizes = popcount[current]
+
+        # Naked singles: the single values of the neighbors are removed from every other cell.
+        # A cell whose single value is also a neighbor's single value breaks the rules.
+        singles = np.zeros((len(active), 82), dtype=np.uint16)
+        singles[:, :81] = np.where(sizes == 1, current, 0)
+        seen = np.bitwise_or.reduce(singles[:, neighbors], axis=2)
+        dead = np.any(singles[:, :81] & seen, axis=1)
+        pruned = np.where(sizes == 1, current, current & ~seen)
+
+        # Hidden singles: once holds the numbers that fit in at least one cell of each unit,
+        # twice the numbers that fit in at least two
+        cells = pruned[:, units]
+        once = np.zeros((len(active), len(units)), dtype=np.uint16)
+        twice = np.zeros_like(once)
+        for k in range(9):
+            twice |= once & cells[:, :, k]
+            once |= cells[:, :, k]
+        dead |= np.any(once != ALL_DIGITS, axis=1)
+
+        # A cell that is the only place for more than one number breaks the rules as well
+        hidden = np.bitwise_or.reduce((once & ~twice)[:, units_of], axis=2) & pruned
+        dead |= np.any(popcount[hidden] > 1, axis=1)
+        pruned = np.where(hidden != 0, hidden, pruned)
+        dead |= np.any(pruned == 0, axis=1)
+
+        # Grids that are impossible or didn't change are done
+        live[active[dead]] = False
+        changed = ~dead & np.any(pruned != current, axis=1)
+        domains[active[changed]] = pruned[changed]
+        active = active[changed]
+    return live
+
+# Solves a list of 9x9 grids with the same rules. The constraint propagation runs on all
+# of the grids at once with NumPy and only the grids that still have empty cells left after
+# that are searched one at a time by SudokuCSP. Returns a list of (solved, grid, moves)
+# tuples where grid is the solved 9x9 grid (or None). Without NumPy every grid is simply
+# solved by SudokuCSP. Raises ValueError if a grid isn't a 9x9 grid of the numbers 0-9.
+def solve_batch(boards, knights=False):
+    flat_boards = [flatten(board) for board in boards]
+    if any(len(board) != CELLS or max(board) > 9 for board in flat_boards):
+        raise ValueError("Every board must be a 9x9 grid of the numbers 0-9")
+
+    results = []
+    if np is None:
+        for board in boards:
+            solver = SudokuCSP(board, knights=knights)
+            solved = solver.solve()
+            results.append((solved, unflatten(solver.board) if solved else None, solver.get_moves()))
+        return results
+
+    grids = np.frombuffer(b"".join(flat_boards), dtype=np.uint8)
+    grids = grids.reshape(-1, 81)
+    domains = np.where(grids == 0, ALL_DIGITS, np.array(DIGIT_BIT, dtype=np.uint16)[grids])
+    domains = domains.astype(np.uint16)
+    live = propagate_batch(domains, knights)
+
+    sizes = np.array(POPCOUNT, dtype=np.uint8)[domains]
+    filled = np.where(sizes == 1, np.array(LOWEST_BIT, dtype=np.uint8)[domains], 0)
+    for i in range(len(grids)):
+        if not live[i]:
+            results.append((False, None, 0))
+            continue
+
+        # Every number filled in by the propagation counts as a move
+        moves = int(np.count_nonzero(filled[i] != grids[i]))
+        if np.all(sizes[i] == 1):
+            results.append((True, unflatten(filled[i].tobytes()), moves))
+            continue
+
+        solver = SudokuCSP(unflatten(filled[i].tobytes()), knights=knights)
+        solved = solver.solve()
+        results.append((solved, unflatten(solver.board) if solved else None,
+                        moves + solver.get_moves()))
+    return results
+
+
+# Returns whether the 9x9 grid is a solution of the board: every number given in the board
+# is kept and every row, column and box (and with knight rules every knight's move) holds
+# different numbers.
+def is_solution(board, grid, knights=False):
+    board = flatten(board)
+    grid = flatten(grid)
+    if len(grid) != CELLS or any(given and given != num for given, num in zip(board, grid)):
+        return False
+    if any(sorted(grid[cell] for cell in unit) != list(range(1, 10)) for unit in UNITS):
+        return False
+    return not knights or all(grid[cell] != grid[other]
+                              for cell in range(CELLS) for other in KNIGHT_NEIGHBORS[cell])
+
+# Solves every board with each available backend and with solve_batch, with and without
+# knight rules, and checks that they agree on which boards can be solved and that every
+# solution is valid. The backends each keep their own copy of the search and the rules,
+# so this catches one of them drifting from the others. Returns the names of the solvers
+# that were checked.
+def check_backends(boards):
+    backends = ["python"]
+    if NUMBA_AVAILABLE:
+        backends.append("numba")
+    if sudoku_solver is not None:
+        backends.append("c")
+
+    for knights in (False, True):
+        results = {}
+        for backend in backends:
+            results[backend] = []
+            for board in boards:
+                solver = SudokuCSP(board, knights=knights, backend=backend)
+                solved = solver.solve()
+                results[backend].append((solved, unflatten(solver.board)))
+        results["batch"] = [(solved, grid) for solved, grid, _ in solve_batch(boards, knights)]
+
+        for name, outcome in results.items():
+            for i, (board, (solved, grid)) in enumerate(zip(boards, outcome)):
+                if solved != results["python"][i][0]:
+                    raise AssertionError(f"{name} disagrees with python on board {i} "
+                                         f"(knights={knights})")
+                if solved and not is_solution(board, grid, knights):
+                    raise AssertionError(f"{name} returned an invalid solution for board {i} "
+                                         f"(knights={knights})")
+    return backends + ["batch"]
+
+
 # This class represents a brute force approach towards solving a sudoku problem,
 # which is obviously much less efficient but serves as a good benchmark and comparison
 # for the approach utilizing the AC-3 algorithm along with the MRV and LCV heuristics.
@@ -251,15 +1007,39 @@ class BruteForceSudoku:
 
     # Initialize the board, including an option for knight moves
     def __init__(self, board, knights = False):
-        self.board = board
-        self.size = 9
+        self.board = flatten(board)
+        self.size = SIZE
         self.move_counter = 0
         self.knights = knights
-        self.knight_moves = [
-            (2, 1), (2, -1), (-2, 1), (-2, -1),
-            (1, 2), (1, -2), (-1, 2), (-1, -2)
-        ]
-        
+
+        # Bitmasks of the numbers already placed in each row, column and box
+        # (bit k set means the number k+1 is used)
+        self.row_mask = [0] * SIZE
+        self.col_mask = [0] * SIZE
+        self.box_mask = [0] * SIZE
+
+        for row in range(SIZE):
+            for col in range(SIZE):
+                num = self.board[row * SIZE + col]
+                if num != 0:
+                    self.place(num, row, col)
+
+    # Places num in the cell and marks it as used in the cell's row, column and box
+    def place(self, num, row, col):
+        bit = 1 << (num - 1)
+        self.board[row * SIZE + col] = num
+        self.row_mask[row] |= bit
+        self.col_mask[col] |= bit
+        self.box_mask[3 * (row // 3) + col // 3] |= bit
+
+    # Empties the cell and frees num in the cell's row, column and box
+    def remove(self, num, row, col):
+        bit = ~(1 << (num - 1))
+        self.board[row * SIZE + col] = 0
+        self.row_mask[row] &= bit
+        self.col_mask[col] &= bit
+        self.box_mask[3 * (row // 3) + col // 3] &= bit
+
     # Method that solves the sudoku grid with a brute force approach, trying every number
     # 1-9 and then checking if that number works. 
     def solve(self):
@@ -271,61 +1051,55 @@ class BruteForceSudoku:
             return True
         row, col = empty
 
-        # Tries every number 1-9 and checks if it is a valid placement, if that number is
-        # then it will be inserted into the grid and solve will be recursively called.
+        # Tries every number 1-9 that is a valid placement (in increasing order, taking the
+        # lowest set bit of the candidates mask each time), that number will be inserted into
+        # the grid and solve will be recursively called.
         # If when solve is recursively called, the board becomes impossible to solve then
         # the cell will be reset to 0 (indicating empty) and the next number in the 1-9
         # sequence will be tried. Every valid placement (even if it doesn't result in a solved
         # grid) will increment the move counter by 1.
-        for num in range(1, 10):
-            if self.is_valid(num, row, col):
-                self.board[row][col] = num
-                self.move_counter += 1
-                if self.solve():
-                    return True
-                self.board[row][col] = 0
+        place = self.place
+        remove = self.remove
+        candidates = self.candidates(row, col)
+        while candidates:
+            num = LOWEST_BIT[candidates]
+            candidates &= candidates - 1
+
+            place(num, row, col)
+            self.move_counter += 1
+            if self.solve():
+                return True
+            remove(num, row, col)
 
         return False
 
     # Method that finds the first empty cell in the grid
     def find_empty(self):
-        for row in range(self.size):
-            for col in range(self.size):
-                if self.board[row][col] == 0:
-                    return (row, col)
-        return None
+        cell = self.board.find(0)
+        if cell == -1:
+            return None
+        return divmod(cell, SIZE)
 
     # Checks if the number placed in the cell (at the row and col coordinates passed in)
     # is a valid placement according to the row, column, box, and knight constraints
     def is_valid(self, num, row, col):
-        for i in range(self.size):
-            if self.board[row][i] == num:
-                return False
+        return bool(self.candidates(row, col) & (1 << (num - 1)))
 
-        for i in range(self.size):
-            if self.board[i][col] == num:
-                return False
+    # Returns a bitmask of every number that can be placed in the cell according to the
+    # row, column, box, and knight constraints
+    def candidates(self, row, col):
+        used = self.row_mask[row] | self.col_mask[col] | self.box_mask[3 * (row // 3) + col // 3]
 
-        # Top left corner of the box the current cell is in
-        box_start_row, box_start_col = 3 * (row // 3), 3 * (col // 3)
-        for i in range(3):
-            for j in range(3):
-                r, c = box_start_row + i, box_start_col + j
-                if self.board[r][c] == num:
-                    return False
-        
         # only checks knight constraints if knight rules are active
         if self.knights:
-            for delta_row, delta_col in self.knight_moves:
-                r, c = row + delta_row, col + delta_col
-                if 0 <= r < self.size and 0 <= c < self.size:
-                    if self.board[r][c] == num:
-                        return False
-        return True
+            board = self.board
+            for cell in KNIGHT_NEIGHBORS[row * SIZE + col]:
+                used |= DIGIT_BIT[board[cell]]
+        return ALL_DIGITS & ~used
 
     # Prints the board
     def print_board(self):
-        for row in self.board:
+        for row in unflatten(self.board):
             print(" ".join(str(num) if num != 0 else '.' for num in row))
         print(f"Total moves made: {self.move_counter}")
 
@@ -404,7 +1178,10 @@ if __name__ == "__main__":
         [0, 0, 0, 0, 0, 9, 7, 0, 0],
     ]
 
-    CSP_grid = copy.deepcopy(knight1)
+    checked = check_backends([sudoku_board, nyt_easy, nyt_medium, nyt_hard, knight1, hardest1])
+    print(f"The solvers agree on every sample board: {', '.join(checked)}")
+
+    CSP_grid = [row[:] for row in knight1]
     CSP_solver = SudokuCSP(CSP_grid, knights = True)
     if CSP_solver.solve():
         print("Sudoku solved:")
@@ -412,7 +1189,7 @@ if __name__ == "__main__":
     else:
         print("No solution exists")
 
-    brute_grid = copy.deepcopy(knight1)
+    brute_grid = [row[:] for row in knight1]
     brute_solver = BruteForceSudoku(brute_grid, knights = True)
     if brute_solver.solve():
         print("Sudoku solved:")
@@ -1,38 +1,146 @@
+import time
+from functools import lru_cache
+from multiprocessing import Pipe, Process
 from flask import Flask, render_template, request, jsonify
-import copy
-from SudokuCSP import SudokuCSP, BruteForceSudoku
+from SudokuCSP import SudokuCSP, BruteForceSudoku, solve_batch, unflatten
 
 app = Flask(__name__)
 
+# Seconds a request waits for a solver before stopping it
+SOLVE_TIMEOUT = 10
+
+# Largest number of puzzles a single /batch request can send
+MAX_BATCH_SIZE = 100
+
+# Raised when a solver process stopped without sending back a result
+class SolverCrashed(Exception):
+    pass
+
+# The solvers run in their own processes so they don't block the request thread, can run
+# in parallel and can be stopped when they take too long. The process sends the result of
+# function(*args) back through the pipe.
+def run_worker(connection, function, args):
+    connection.send(function(*args))
+    connection.close()
+
+# Starts function(*args) in a new process, returns the process and the end of its pipe
+def start_worker(function, *args):
+    receiver, sender = Pipe(duplex=False)
+    process = Process(target=run_worker, args=(sender, function, args), daemon=True)
+    process.start()
+    sender.close()
+    return process, receiver
+
+# Waits until the deadline (a time.monotonic() value) for the result of a worker and returns
+# it, or None if the worker didn't finish in time. The worker's process is stopped either way.
+def finish_worker(worker, deadline):
+    process, receiver = worker
+    try:
+        if not receiver.poll(max(0, deadline - time.monotonic())):
+            return None
+        try:
+            return receiver.recv()
+        except EOFError:
+            raise SolverCrashed
+    finally:
+        process.terminate()
+        process.join()
+        receiver.close()
+
+# Converts the input data of a puzzle into a 9x9 grid (a tuple of tuples, empty cells are 0).
+# Raises ValueError if it isn't a 9x9 grid of the numbers 0-9.
+def parse_grid(puzzle):
+    if not isinstance(puzzle, list) or len(puzzle) != 9 or \
+            any(not isinstance(row, list) or len(row) != 9 for row in puzzle):
+        raise ValueError('A puzzle must be a 9x9 grid')
+    try:
+        grid = tuple(tuple(int(num) if num != '' else 0 for num in row) for row in puzzle)
+    except (TypeError, ValueError):
+        raise ValueError('A puzzle can only contain numbers and empty cells')
+    if any(not 0 <= num <= 9 for row in grid for num in row):
+        raise ValueError('The numbers of a puzzle must be between 0 and 9')
+    return grid
+
+# Solves the grid with the given solver class (runs in a worker process)
+def run_solver(solver_class, grid, knights):
+    solver = solver_class(grid, knights=knights)
+    solved = solver.solve()
+    return solved, unflatten(solver.board) if solved else None, solver.get_moves()
+
+# Solves the grid with both solvers at the same time, a solver that doesn't finish within
+# SOLVE_TIMEOUT seconds is stopped and its result is None. The grid is a tuple of tuples so
+# the results of repeated puzzles (timed out ones included) can be served from the cache.
+@lru_cache(maxsize=1024)
+def solve_puzzle(grid, knights):
+    deadline = time.monotonic() + SOLVE_TIMEOUT
+    csp_worker = start_worker(run_solver, SudokuCSP, grid, knights)
+    brute_worker = start_worker(run_solver, BruteForceSudoku, grid, knights)
+    try:
+        csp_result = finish_worker(csp_worker, deadline)
+    except SolverCrashed:
+        finish_worker(brute_worker, 0)
+        raise
+    return csp_result, finish_worker(brute_worker, deadline)
+
+# Response for requests whose solver process died
+@app.errorhandler(SolverCrashed)
+def solver_crashed(error):
+    return jsonify({'error': 'A solver process stopped unexpectedly, please try again'}), 503
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     if request.method == 'POST':
         puzzle = request.json['puzzle']
-        knights_rule = request.json['knights']
-        
+        knights_rule = bool(request.json['knights'])
+
         # Convert input data into 9x9 grid
-        grid = [[int(num) if num != '' else 0 for num in row] for row in puzzle]
-        
-        # Solve using SudokuCSP
-        csp_solver = SudokuCSP(copy.deepcopy(grid), knights=knights_rule)
-        csp_solution = csp_solver.solve()
-        csp_moves =  csp_solver.get_moves()
-        
-        # Solve using Brute Force
-        brute_solver = BruteForceSudoku(copy.deepcopy(grid), knights=knights_rule)
-        brute_solution = brute_solver.solve()
-        brute_moves =  brute_solver.get_moves()
+        try:
+            grid = parse_grid(puzzle)
+        except ValueError as error:
+            return jsonify({'error': str(error)}), 400
+
+        # Solve using SudokuCSP and Brute Force, a solver that timed out has no result
+        csp_result, brute_result = solve_puzzle(grid, knights_rule)
+        csp_solution, csp_grid, csp_moves = csp_result or (False, None, None)
+        brute_solution, brute_grid, brute_moves = brute_result or (False, None, None)
 
         return jsonify({
             'csp_solved': csp_solution,
-            'csp_grid': csp_solver.board if csp_solution else None,
+            'csp_grid': csp_grid,
             'csp_moves': csp_moves,
+            'csp_timed_out': csp_result is None,
             'brute_solved': brute_solution,
-            'brute_grid': brute_solver.board if brute_solution else None,
-            'brute_moves': brute_moves
+            'brute_grid': brute_grid,
+            'brute_moves': brute_moves,
+            'brute_timed_out': brute_result is None
         })
 
     return render_template('index.html')
 
+# Solves a list of puzzles with the same rules at once using SudokuCSP
+@app.route('/batch', methods=['POST'])
+def batch():
+    data = request.get_json(silent=True)
+    puzzles = data.get('puzzles') if isinstance(data, dict) else None
+    if not isinstance(puzzles, list) or len(puzzles) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'Send a list of at most {MAX_BATCH_SIZE} puzzles'}), 400
+    knights_rule = bool(data.get('knights', False))
+
+    # Convert input data into 9x9 grids
+    try:
+        grids = [parse_grid(puzzle) for puzzle in puzzles]
+    except ValueError as error:
+        return jsonify({'error': str(error)}), 400
+
+    results = finish_worker(start_worker(solve_batch, grids, knights_rule),
+                            time.monotonic() + SOLVE_TIMEOUT)
+    if results is None:
+        return jsonify({'error': f'The batch did not finish within {SOLVE_TIMEOUT} seconds'}), 504
+
+    return jsonify({
+        'results': [{'solved': solved, 'grid': grid, 'moves': moves}
+                    for solved, grid, moves in results]
+    })
+
 if __name__ == '__main__':
     app.run(debug=True)
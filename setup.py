@@ -0,0 +1,10 @@
+from setuptools import setup, Extension
+
+# Builds the optional C extension used by SudokuCSP(board, knights, backend="c") next to
+# SudokuCSP.py with:
+#   python setup.py build_ext --inplace
+setup(
+    name="SudokuCSP",
+    py_modules=["SudokuCSP"],
+    ext_modules=[Extension("sudoku_solver", ["sudoku_solver.c"], extra_compile_args=["-O2"])],
+)
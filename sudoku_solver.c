@@ -0,0 +1,245 @@
+/*
+ * C version of the CSP search used by SudokuCSP.solve with the "c" backend (the pure
+ * Python solver in SudokuCSP.py is the default). It works the same way as
+ * solve_core: every cell has a 9-bit domain, arc consistency and hidden singles are
+ * maintained after every placement, cells are picked by MRV and every pruned domain is
+ * saved on a trail so a placement can be undone. All of the state fits in a few KB.
+ *
+ * Build it next to SudokuCSP.py with:
+ *   python setup.py build_ext --inplace
+ * and pick it with SudokuCSP(board, knights, backend="c").
+ *
+ * sudoku_solver.solve(board, knights) takes the 81 numbers of the board as bytes (0 is
+ * an empty cell) and returns a (solved, board, moves) tuple.
+ */
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <stdint.h>
+#include <string.h>
+
+#define CELLS 81
+#define ALL_DIGITS 0x1FF
+#define MAX_NEIGHBORS 28
+#define TRAIL_SIZE (CELLS * 10)
+
+/* Cells each cell can "see", without ([0]) and with ([1]) knight rules */
+static int neighbors[2][CELLS][MAX_NEIGHBORS];
+static int neighbor_count[2][CELLS];
+
+/* The 9 rows, 9 columns and 9 boxes */
+static int units[27][9];
+
+typedef struct {
+    uint16_t domains[CELLS];
+    uint8_t board[CELLS];
+    uint8_t trail_cell[TRAIL_SIZE];
+    uint16_t trail_mask[TRAIL_SIZE];
+    int trail_length;
+    int queue[CELLS * 2];
+    const int (*neighbors)[MAX_NEIGHBORS];
+    const int *neighbor_count;
+    long moves;
+} Solver;
+
+static inline int popcount(uint32_t x) { return __builtin_popcount(x); }
+static inline int lowest_bit(uint32_t x) { return __builtin_ctz(x); }
+
+static void build_tables(void)
+{
+    static const int knight_moves[8][2] = {
+        {2, 1}, {2, -1}, {-2, 1}, {-2, -1}, {1, 2}, {1, -2}, {-1, 2}, {-1, -2}
+    };
+
+    for (int cell = 0; cell < CELLS; cell++) {
+        int row = cell / 9, col = cell % 9;
+        for (int knights = 0; knights < 2; knights++) {
+            int count = 0;
+            for (int other = 0; other < CELLS; other++) {
+                int r = other / 9, c = other % 9;
+                int sees = other != cell &&
+                           (r == row || c == col || (r / 3 == row / 3 && c / 3 == col / 3));
+                for (int k = 0; knights && !sees && k < 8; k++)
+                    sees = r == row + knight_moves[k][0] && c == col + knight_moves[k][1];
+                if (sees)
+                    neighbors[knights][cell][count++] = other;
+            }
+            neighbor_count[knights][cell] = count;
+        }
+    }
+
+    for (int i = 0; i < 9; i++) {
+        for (int j = 0; j < 9; j++) {
+            units[i][j] = i * 9 + j;
+            units[9 + i][j] = j * 9 + i;
+            units[18 + i][j] = (3 * (i / 3) + j / 3) * 9 + 3 * (i % 3) + j % 3;
+        }
+    }
+}
+
+/* Removes bits from the domain of a cell, saving the original domain on the trail */
+static inline void prune(Solver *s, int cell, uint16_t remove)
+{
+    s->trail_cell[s->trail_length] = (uint8_t)cell;
+    s->trail_mask[s->trail_length] = s->domains[cell];
+    s->trail_length++;
+    s->domains[cell] &= (uint16_t)~remove;
+}
+
+static inline void undo(Solver *s, int mark)
+{
+    while (s->trail_length > mark) {
+        s->trail_length--;
+        s->domains[s->trail_cell[s->trail_length]] = s->trail_mask[s->trail_length];
+    }
+}
+
+/* Propagates every queued cell that has a single value left and then fills in the
+ * hidden singles of every unit, until nothing changes. Returns 0 if a domain or a unit
+ * ran out of values. */
+static int propagate(Solver *s, int queue_length)
+{
+    while (queue_length > 0) {
+        for (int head = 0; head < queue_length; head++) {
+            int cell = s->queue[head];
+            uint16_t value = s->domains[cell];
+            for (int k = 0; k < s->neighbor_count[cell]; k++) {
+                int neighbor = s->neighbors[cell][k];
+                if (s->domains[neighbor] & value) {
+                    prune(s, neighbor, value);
+                    if (s->domains[neighbor] == 0)
+                        return 0;
+                    if (popcount(s->domains[neighbor]) == 1)
+                        s->queue[queue_length++] = neighbor;
+                }
+            }
+        }
+
+        /* Hidden singles, any new singleton is queued for the next round */
+        queue_length = 0;
+        for (int u = 0; u < 27; u++) {
+            uint16_t once = 0, twice = 0;
+            for (int k = 0; k < 9; k++) {
+                uint16_t mask = s->domains[units[u][k]];
+                twice |= once & mask;
+                once |= mask;
+            }
+            if (once != ALL_DIGITS)
+                return 0;
+            for (uint16_t hidden = once & ~twice; hidden; hidden &= hidden - 1) {
+                uint16_t bit = hidden & -hidden;
+                for (int k = 0; k < 9; k++) {
+                    int cell = units[u][k];
+                    if (s->domains[cell] & bit) {
+                        if (s->domains[cell] != bit) {
+                            prune(s, cell, (uint16_t)~bit);
+                            s->queue[queue_length++] = cell;
+                        }
+                        break;
+                    }
+                }
+            }
+        }
+    }
+    return 1;
+}
+
+/* Returns the empty cell with the fewest values left in its domain, or -1 if the board is full */
+static int mrv(const Solver *s)
+{
+    int best = -1, best_size = 10;
+    for (int cell = 0; cell < CELLS; cell++) {
+        if (s->board[cell] == 0 && popcount(s->domains[cell]) < best_size) {
+            best = cell;
+            best_size = popcount(s->domains[cell]);
+        }
+    }
+    return best;
+}
+
+static int search(Solver *s)
+{
+    int cell = mrv(s);
+    if (cell < 0)
+        return 1;
+
+    int mark = s->trail_length;
+    for (uint16_t remaining = s->domains[cell]; remaining; remaining &= remaining - 1) {
+        uint16_t bit = remaining & -remaining;
+        s->board[cell] = (uint8_t)(lowest_bit(bit) + 1);
+        s->moves++;
+
+        int consistent = 1;
+        if (s->domains[cell] != bit) {
+            prune(s, cell, (uint16_t)~bit);
+            s->queue[0] = cell;
+            consistent = propagate(s, 1);
+        }
+        if (consistent && search(s))
+            return 1;
+        undo(s, mark);
+    }
+    s->board[cell] = 0;
+    return 0;
+}
+
+static PyObject *solve(PyObject *self, PyObject *args)
+{
+    Py_buffer board;
+    int knights;
+    if (!PyArg_ParseTuple(args, "y*p", &board, &knights))
+        return NULL;
+    if (board.len != CELLS) {
+        PyBuffer_Release(&board);
+        PyErr_SetString(PyExc_ValueError, "board must contain 81 cells");
+        return NULL;
+    }
+
+    Solver s;
+    memcpy(s.board, board.buf, CELLS);
+    PyBuffer_Release(&board);
+    s.trail_length = 0;
+    s.neighbors = (const int (*)[MAX_NEIGHBORS])neighbors[knights];
+    s.neighbor_count = neighbor_count[knights];
+    s.moves = 0;
+
+    int queue_length = 0, consistent = 1;
+    for (int cell = 0; cell < CELLS; cell++) {
+        if (s.board[cell] > 9) {
+            PyErr_SetString(PyExc_ValueError, "board numbers must be between 0 and 9");
+            return NULL;
+        }
+        if (s.board[cell] == 0) {
+            s.domains[cell] = ALL_DIGITS;
+        } else {
+            s.domains[cell] = (uint16_t)(1 << (s.board[cell] - 1));
+            s.queue[queue_length++] = cell;
+        }
+    }
+
+    int solved = 0;
+    Py_BEGIN_ALLOW_THREADS
+    consistent = propagate(&s, queue_length);
+    solved = consistent && search(&s);
+    Py_END_ALLOW_THREADS
+
+    return Py_BuildValue("Ny#l", PyBool_FromLong(solved), (const char *)s.board,
+                         (Py_ssize_t)CELLS, s.moves);
+}
+
+static PyMethodDef methods[] = {
+    {"solve", solve, METH_VARARGS,
+     "solve(board, knights) -> (solved, board, moves)\n\n"
+     "Solves the 81 byte board and returns whether it was solved, the resulting board "
+     "and the number of moves made."},
+    {NULL, NULL, 0, NULL}
+};
+
+static struct PyModuleDef module = {
+    PyModuleDef_HEAD_INIT, "sudoku_solver", "C version of the SudokuCSP search.", -1, methods
+};
+
+PyMODINIT_FUNC PyInit_sudoku_solver(void)
+{
+    build_tables();
+    return PyModule_Create(&module);
+}